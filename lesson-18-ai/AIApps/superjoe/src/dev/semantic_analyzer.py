@@ -4,16 +4,52 @@ Semantic Comparison Tool
 A streamlit app for analyzing semantic relationships between languages.
 
 Requirements:
-    pip install streamlit sentence-transformers numpy pandas plotly
+    pip install streamlit sentence-transformers numpy plotly
+    pip install optimum[onnxruntime]  # optional, faster int8 ONNX Runtime inference on CPU
 """
 
+import os
+import shutil
+import tempfile
 import streamlit as st
 import numpy as np
-import pandas as pd
-import plotly.express as px
 import plotly.graph_objs
+import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Tuple, Dict
+from functools import lru_cache
+from typing import Callable, List, Tuple, Dict, Union
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+except ImportError:
+    ORTModelForFeatureExtraction = None
+
+def physical_core_count() -> int:
+    """Count the cores this process may use, without SMT siblings when psutil is installed"""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    try:
+        import psutil
+        physical = psutil.cpu_count(logical=False)
+    except ImportError:
+        physical = None
+    return min(available, physical) if physical else available
+
+# Use one thread per physical core for the transformer matmuls; streamlit
+# re-executes this script on each rerun, so only touch the pools when needed
+# (the interop pool can only be sized before it is first used)
+NUM_THREADS = physical_core_count()
+if torch.get_num_threads() != NUM_THREADS:
+    torch.set_num_threads(NUM_THREADS)
+if torch.get_num_interop_threads() != 1:
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
 
 # Available languages
 LANGUAGES = {
@@ -23,6 +59,7 @@ LANGUAGES = {
     'French': 'fr',
     'Japanese': 'ja'
 }
+LANGUAGE_NAMES = tuple(LANGUAGES.keys())
 
 # Dynamic semantic fields based on common categories
 SEMANTIC_CONTEXT = {
@@ -59,47 +96,162 @@ EXAMPLE_PAIRS = {
     'Person': {'English': 'person', 'Chinese': '人', 'Spanish': 'persona', 'French': 'personne', 'Japanese': '人'}
 }
 
+# Category probe words
+CATEGORY_PROBES = {
+    'animal': 'animal pet creature',
+    'human': 'human person people',
+    'object': 'thing object item'
+}
+PROBE_LABELS = tuple(CATEGORY_PROBES.keys())
+
+# Star ratings for similarity scores 0.0 - 1.0
+SIMILARITY_DISPLAY = tuple("⭐" * stars + "☆" * (10 - stars) for stars in range(11))
+
+MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+# Token limit the SentenceTransformer model was trained with; both backends truncate to it
+MAX_SEQ_LENGTH = 128
+# Per-user cache of ONNX exports, one directory per model, so export only happens once
+ONNX_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                              'semantic-analyzer', 'onnx')
+ONNX_FILE_NAME = 'model_quantized.onnx'
+
+def get_onnx_model_dir(model_name: str) -> str:
+    """Cache directory holding the ONNX export of model_name"""
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '--'))
+
+def export_onnx_model(model_name: str, model_dir: str) -> None:
+    """Export model_name to int8 ONNX in a temporary directory and move it into model_dir when complete"""
+    parent = os.path.dirname(model_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.export-', dir=parent)
+    try:
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+        # Dynamic int8 quantization (VNNI kernels where the CPU has them); only the
+        # quantized graph is kept
+        quantizer = ORTQuantizer.from_pretrained(tmp_dir, file_name='model.onnx')
+        quantizer.quantize(save_dir=tmp_dir,
+                           quantization_config=AutoQuantizationConfig.avx512_vnni(
+                               is_static=False, per_channel=False))
+        os.remove(os.path.join(tmp_dir, 'model.onnx'))
+        # Clear out an incomplete directory left by an earlier run
+        shutil.rmtree(model_dir, ignore_errors=True)
+        os.replace(tmp_dir, model_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+class OnnxSentenceEncoder:
+    """ONNX Runtime version of the multilingual model with a SentenceTransformer-style encode"""
+
+    def __init__(self, model_name: str):
+        model_dir = get_onnx_model_dir(model_name)
+        if not os.path.isfile(os.path.join(model_dir, ONNX_FILE_NAME)):
+            export_onnx_model(model_name, model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name=ONNX_FILE_NAME)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False) -> np.ndarray:
+        """Tokenize, run the ONNX session and mean-pool the token embeddings"""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(sentences[start:start + batch_size], padding=True,
+                                    truncation=True, max_length=MAX_SEQ_LENGTH,
+                                    return_tensors='np')
+            token_embeddings = self.model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled)
+        embeddings = np.concatenate(batches).astype(np.float32)
+
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings[0] if single else embeddings
+
+# Either backend returned by load_model
+SentenceEncoder = Union[SentenceTransformer, OnnxSentenceEncoder]
+
 @st.cache_resource
-def load_model():
-    """Load the multilingual model"""
-    return SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+def load_model() -> SentenceEncoder:
+    """Load the multilingual model: fp16 on GPU; on CPU int8 ONNX Runtime when optimum
+    is installed, otherwise int8-quantized PyTorch"""
+    if torch.cuda.is_available():
+        model = SentenceTransformer(MODEL_NAME)
+        model.max_seq_length = MAX_SEQ_LENGTH
+        return model.half()
+
+    if ORTModelForFeatureExtraction is not None:
+        return OnnxSentenceEncoder(MODEL_NAME)
+
+    # Fall back to PyTorch with dynamic int8 quantization of the Linear layers
+    model = SentenceTransformer(MODEL_NAME)
+    model.max_seq_length = MAX_SEQ_LENGTH
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+@st.cache_resource
+def load_probe_matrix(_model: SentenceEncoder) -> np.ndarray:
+    """Encode the category probes once per model, one row per PROBE_LABELS entry"""
+    embeddings = _model.encode([CATEGORY_PROBES[c] for c in PROBE_LABELS],
+                               batch_size=len(PROBE_LABELS), convert_to_numpy=True,
+                               normalize_embeddings=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+@st.cache_resource
+def load_context_embeddings(_model: SentenceEncoder) -> Dict[Tuple[str, str], np.ndarray]:
+    """Encode the context words of every (category, language) pair once per model"""
+    keys = [(category, lang) for category, fields in SEMANTIC_CONTEXT.items() for lang in fields]
+    words = [word for category, lang in keys for word in SEMANTIC_CONTEXT[category][lang]]
+    embeddings = _model.encode(words, batch_size=len(words), convert_to_numpy=True,
+                               normalize_embeddings=True)
+
+    context_embeddings = {}
+    start = 0
+    for category, lang in keys:
+        end = start + len(SEMANTIC_CONTEXT[category][lang])
+        context_embeddings[(category, lang)] = np.ascontiguousarray(embeddings[start:end],
+                                                                    dtype=np.float32)
+        start = end
+    return context_embeddings
+
+@st.cache_resource
+def load_text_encoder(_model: SentenceEncoder) -> Callable[[str], np.ndarray]:
+    """Memoize user-text embeddings so streamlit reruns skip repeated forward passes"""
+    @lru_cache(maxsize=4096)
+    def encode_text(text: str) -> np.ndarray:
+        return np.ascontiguousarray(_model.encode(text, normalize_embeddings=True),
+                                    dtype=np.float32)
+    return encode_text
 
 def compute_similarity(v1: np.ndarray, v2: np.ndarray) -> float:
-    """Compute cosine similarity between two vectors"""
-    dot_product = np.dot(v1, v2)
-    norm1 = np.linalg.norm(v1)
-    norm2 = np.linalg.norm(v2)
-    return dot_product / (norm1 * norm2)
+    """Compute cosine similarity between two L2-normalized vectors"""
+    return float(v1 @ v2)
+
+def rank_similarities(matrix: np.ndarray, vector: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Score each row of matrix against vector, returning indices and scores best first"""
+    sims = matrix @ vector
+    order = np.argsort(-sims)
+    return order, sims[order]
 
 def get_similarity_display(score: float) -> str:
     """Create visual representation of similarity score"""
-    stars = int(score * 10)
-    return "⭐" * stars + "☆" * (10 - stars)
-
-def get_semantic_category(text: str, model: SentenceTransformer) -> str:
-    """Dynamically determine the semantic category of the input text"""
-    # Category probe words
-    probes = {
-        'animal': 'animal pet creature',
-        'human': 'human person people',
-        'object': 'thing object item'
-    }
-    
+    return SIMILARITY_DISPLAY[max(0, min(10, int(score * 10)))]
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def get_semantic_category(text: str, _model: SentenceEncoder) -> str:
+    """Dynamically determine the semantic category of the input text, cached per text"""
     # Get embeddings
-    text_embedding = model.encode(text)
-    similarities = {}
-    
-    # Compare with each category
-    for category, probe in probes.items():
-        probe_embedding = model.encode(probe)
-        similarity = compute_similarity(text_embedding, probe_embedding)
-        similarities[category] = similarity
+    text_embedding = load_text_encoder(_model)(text)
+    probe_matrix = load_probe_matrix(_model)
     
     # Return the most similar category
-    return max(similarities.items(), key=lambda x: x[1])[0]
+    return PROBE_LABELS[int(np.argmax(probe_matrix @ text_embedding))]
 
-def get_semantic_field(text: str, lang: str, model: SentenceTransformer) -> List[Tuple[str, float]]:
-    """Get semantic field (related words) for given text using dynamic context"""
+def get_semantic_field(text: str, lang: str, model: SentenceEncoder) -> Tuple[List[str], np.ndarray]:
+    """Get semantic field (related words and their similarities, best first) for given text"""
     # First determine the general category
     category = get_semantic_category(text, model)
     
@@ -107,33 +259,25 @@ def get_semantic_field(text: str, lang: str, model: SentenceTransformer) -> List
     context_words = SEMANTIC_CONTEXT[category][lang]
     
     # Get embeddings and similarities
-    text_embedding = model.encode(text)
-    similarities = []
+    text_embedding = load_text_encoder(model)(text)
+    context_matrix = load_context_embeddings(model)[(category, lang)]
     
-    # Add the category-specific context words
-    for word in context_words:
-        word_embedding = model.encode(word)
-        similarity = compute_similarity(text_embedding, word_embedding)
-        similarities.append((word, similarity))
+    # Compare against all category-specific context words at once
+    order, sims = rank_similarities(context_matrix, text_embedding)
     
-    return sorted(similarities, key=lambda x: x[1], reverse=True)
+    return [context_words[i] for i in order], sims
 
-def plot_semantic_comparison(similarities1: List[Tuple[str, float]], 
-                           similarities2: List[Tuple[str, float]],
+def plot_semantic_comparison(word_pairs: List[str], sims1: np.ndarray, sims2: np.ndarray,
                            lang1: str, lang2: str) -> plotly.graph_objs.Figure:
     """Create a comparison plot of semantic similarities"""
-    df = pd.DataFrame({
-        f'{lang1}': [s[1] for s in similarities1],
-        f'{lang2}': [s[1] for s in similarities2],
-        'Words': [f'{s1[0]}/{s2[0]}' for s1, s2 in zip(similarities1, similarities2)]
-    })
-    
-    fig = px.bar(df, x='Words', y=[f'{lang1}', f'{lang2}'],
-                 title='Semantic Field Comparison',
-                 barmode='group',
-                 color_discrete_sequence=['#FF4B4B', '#0068C9'])
+    fig = plotly.graph_objs.Figure([
+        plotly.graph_objs.Bar(name=lang1, x=word_pairs, y=sims1, marker_color='#FF4B4B'),
+        plotly.graph_objs.Bar(name=lang2, x=word_pairs, y=sims2, marker_color='#0068C9')
+    ])
     
     fig.update_layout(
+        title='Semantic Field Comparison',
+        barmode='group',
         xaxis_title="Word Pairs",
         yaxis_title="Semantic Similarity",
         height=400
@@ -162,7 +306,7 @@ def main():
     # Language and text input
     col1, col2 = st.columns(2)
     with col1:
-        lang1 = st.selectbox("First Language", options=list(LANGUAGES.keys()), key='lang1')
+        lang1 = st.selectbox("First Language", options=LANGUAGE_NAMES, key='lang1')
         if 'example_pair' in st.session_state:
             default_text1 = st.session_state['example_pair'][lang1]
         else:
@@ -170,7 +314,7 @@ def main():
         text1 = st.text_area("Enter text", value=default_text1, height=100, key='text1')
         
     with col2:
-        lang2 = st.selectbox("Second Language", options=list(LANGUAGES.keys()), key='lang2')
+        lang2 = st.selectbox("Second Language", options=LANGUAGE_NAMES, key='lang2')
         if 'example_pair' in st.session_state:
             default_text2 = st.session_state['example_pair'][lang2]
         else:
@@ -183,13 +327,14 @@ def main():
             with st.spinner("Analyzing semantic relationships..."):
                 try:
                     # Get embeddings and calculate similarity
-                    embed1 = model.encode(text1)
-                    embed2 = model.encode(text2)
+                    encode_text = load_text_encoder(model)
+                    embed1 = encode_text(text1)
+                    embed2 = encode_text(text2)
                     similarity = compute_similarity(embed1, embed2)
                     
                     # Get semantic fields
-                    field1 = get_semantic_field(text1, lang1, model)
-                    field2 = get_semantic_field(text2, lang2, model)
+                    words1, sims1 = get_semantic_field(text1, lang1, model)
+                    words2, sims2 = get_semantic_field(text2, lang2, model)
                     
                     # Display results
                     st.header("Analysis Results")
@@ -215,16 +360,17 @@ def main():
                     col1, col2 = st.columns(2)
                     with col1:
                         st.write(f"**{lang1} semantic field:**")
-                        for word, sim in field1[:5]:
+                        for word, sim in zip(words1[:5], sims1[:5]):
                             st.write(f"- {word}: {sim:.2f} {get_similarity_display(sim)}")
                     with col2:
                         st.write(f"**{lang2} semantic field:**")
-                        for word, sim in field2[:5]:
+                        for word, sim in zip(words2[:5], sims2[:5]):
                             st.write(f"- {word}: {sim:.2f} {get_similarity_display(sim)}")
 
                     # Visualization
                     st.subheader("Comparative Analysis")
-                    fig = plot_semantic_comparison(field1, field2, lang1, lang2)
+                    word_pairs = [f'{w1}/{w2}' for w1, w2 in zip(words1, words2)]
+                    fig = plot_semantic_comparison(word_pairs, sims1, sims2, lang1, lang2)
                     st.plotly_chart(fig, use_container_width=True)
 
                     # Interpretation
@@ -25,27 +25,27 @@ LANGUAGES = {
     'Hindi': 'hi',
     'German': 'de'
 }
+LANGUAGE_NAMES = tuple(LANGUAGES.keys())
 
+@st.cache_data(ttl=30, show_spinner=False)
 def check_internet() -> bool:
-    """Check if internet connection is available"""
+    """Check if internet connection is available, re-checked at most every 30s"""
     try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return True
+        with socket.create_connection(("8.8.8.8", 53), timeout=1):
+            return True
     except OSError:
         return False
 
+@st.cache_data(ttl=3600, max_entries=1024, show_spinner=False)
 def translate_text(text: str, source_lang: str, target_lang: str) -> Optional[str]:
-    """Translate text with error handling"""
+    """Translate text, caching results; errors propagate so failures are not cached"""
     if not text:
         return None
         
-    try:
-        translator = GoogleTranslator(source=source_lang, target=target_lang)
-        result = translator.translate(text)
-        return result
-    except Exception as e:
-        st.error(f"Translation error: {str(e)}")
-        return None
+    # GoogleTranslator keeps per-call state on the instance, so it is not
+    # shared between sessions; the cached results already avoid rebuilding it
+    translator = GoogleTranslator(source=source_lang, target=target_lang)
+    return translator.translate(text)
 
 def main():
     st.set_page_config(page_title="Translation Tool", page_icon="🌐")
@@ -63,16 +63,16 @@ def main():
     # Language selection
     col1, col2 = st.columns(2)
     with col1:
-        source_lang = st.selectbox("From:", options=list(LANGUAGES.keys()), key='source')
+        source_lang = st.selectbox("From:", options=LANGUAGE_NAMES, key='source')
     with col2:
-        target_lang = st.selectbox("To:", options=list(LANGUAGES.keys()), 
+        target_lang = st.selectbox("To:", options=LANGUAGE_NAMES, 
                                  index=1 if len(LANGUAGES) > 1 else 0, key='target')
 
     # Quick language swap
     if st.button("🔄 Swap Languages"):
         # Get current indexes
-        source_idx = list(LANGUAGES.keys()).index(source_lang)
-        target_idx = list(LANGUAGES.keys()).index(target_lang)
+        source_idx = LANGUAGE_NAMES.index(source_lang)
+        target_idx = LANGUAGE_NAMES.index(target_lang)
         # Store in session state
         st.session_state['source'] = target_idx
         st.session_state['target'] = source_idx
@@ -94,11 +94,15 @@ def main():
         st.markdown(f"**Translation in {target_lang}:**")
         if source_text:
             with st.spinner("Translating..."):
-                translation = translate_text(
-                    source_text,
-                    LANGUAGES[source_lang],
-                    LANGUAGES[target_lang]
-                )
+                try:
+                    translation = translate_text(
+                        source_text,
+                        LANGUAGES[source_lang],
+                        LANGUAGES[target_lang]
+                    )
+                except Exception as e:
+                    st.error(f"Translation error: {str(e)}")
+                    translation = None
                 if translation:
                     st.text_area("Translation", value=translation, height=200, disabled=True)
                     # Word count for translation